@@ -3,6 +3,7 @@ import json
 from flask import Flask, render_template, request, jsonify
 from flask_cors import CORS
 from index2 import ReasoningExtractor
+from key_pool import load_keys
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -59,17 +60,34 @@ def get_results():
             'message': f'Could not load results: {str(e)}'
         }), 500
 
+@app.route('/api/prompt-stats')
+def get_prompt_stats():
+    """Get per-template token counts and prefix cache usage."""
+    return jsonify(extractor.get_prompt_stats())
+
+@app.route('/api/key-stats')
+def get_key_stats():
+    """Get per-key API usage and remaining quota."""
+    return jsonify(extractor.get_key_stats())
+
 if __name__ == '__main__':
     # Create templates directory if it doesn't exist
     os.makedirs('templates', exist_ok=True)
     
     # Check if API keys are set
-    if not os.getenv('OPENAI_API_KEY') or not os.getenv('DEEPSEEK_API_KEY'):
+    openai_keys = load_keys('OPENAI_API_KEY')
+    deepseek_keys = load_keys('DEEPSEEK_API_KEY')
+    if extractor.replayer:
+        print(f"Replaying {len(extractor.replayer)} recorded exchanges from {extractor.replayer.path}.")
+    elif not openai_keys or not deepseek_keys:
         print("WARNING: API keys not found in environment variables.")
         print("Set OPENAI_API_KEY and DEEPSEEK_API_KEY environment variables before running.")
         print("You can create a .env file with these variables for local development.")
     else:
-        print("API Keys configured from environment variables.")
+        if extractor.recorder:
+            print(f"Recording provider exchanges to {extractor.recorder.path}.")
+        print(f"API Keys configured from environment variables "
+              f"({len(openai_keys)} OpenAI, {len(deepseek_keys)} DeepSeek).")
     
     print("\nStarting Flask server on http://127.0.0.1:5000")
     app.run(debug=True) 
\ No newline at end of file
@@ -1,10 +1,14 @@
 import re
 import os
 import json
+import time
 import requests
 from typing import Dict, List, Optional, Union
 from datetime import datetime
 from dotenv import load_dotenv
+from prompt_templates import PromptRegistry, build_default_registry
+from key_pool import KeyPool, load_keys
+from record_replay import ExchangeRecorder, ExchangeReplayer
 
 # Load environment variables from .env file if present
 load_dotenv()
@@ -21,35 +25,123 @@ class ReasoningExtractor:
     # Demo/test API keys placeholders - these will be replaced with env vars
     DEMO_OPENAI_KEY = "demo-openai-key-placeholder"
     DEMO_DEEPSEEK_KEY = "demo-deepseek-key-placeholder"
+    REPLAY_KEY = "replay-key-placeholder"
     
-    def __init__(self, use_demo_keys: bool = False):
+    def __init__(self, use_demo_keys: bool = False, record_path: Optional[str] = None,
+                 replay_path: Optional[str] = None, replay_latency_scale: Optional[float] = None,
+                 replay_strict: Optional[bool] = None):
         """
         Initialize the ReasoningExtractor with API keys.
         Will try to load from environment variables first, then fall back to demo keys if specified.
         
         Args:
             use_demo_keys (bool): If True, use demo keys for testing. Default False.
+            record_path (Optional[str]): Archive to record provider exchanges to.
+                Defaults to the REASONING_RECORD_PATH environment variable.
+            replay_path (Optional[str]): Archive to serve provider exchanges from
+                instead of the network. Defaults to REASONING_REPLAY_PATH.
+            replay_latency_scale (Optional[float]): Multiplier for recorded latencies
+                when replaying. Defaults to REASONING_REPLAY_LATENCY_SCALE or 1.0.
+            replay_strict (Optional[bool]): If True, requests that were never recorded
+                fail instead of being served a recording of the same template.
+                Defaults to REASONING_REPLAY_STRICT or True.
         """
+        record_path = record_path or os.getenv('REASONING_RECORD_PATH')
+        replay_path = replay_path or os.getenv('REASONING_REPLAY_PATH')
+        if record_path and replay_path:
+            raise ValueError("Record and replay modes cannot be used together.")
+        if replay_latency_scale is None:
+            replay_latency_scale = float(os.getenv('REASONING_REPLAY_LATENCY_SCALE', '1.0'))
+        if replay_strict is None:
+            replay_strict = os.getenv('REASONING_REPLAY_STRICT', '1').lower() not in ('0', 'false', 'no')
+
+        self.recorder = ExchangeRecorder(record_path) if record_path else None
+        self.replayer = (
+            ExchangeReplayer(replay_path, latency_scale=replay_latency_scale, strict=replay_strict)
+            if replay_path else None
+        )
+
         if use_demo_keys:
-            self.openai_api_key = self.DEMO_OPENAI_KEY
-            self.deepseek_api_key = self.DEMO_DEEPSEEK_KEY
+            openai_keys = [self.DEMO_OPENAI_KEY]
+            deepseek_keys = [self.DEMO_DEEPSEEK_KEY]
             print("WARNING: Using demo keys. These are placeholders and will not work for actual API calls.")
         else:
-            # Try to get from environment variables
-            self.openai_api_key = os.getenv('OPENAI_API_KEY')
-            self.deepseek_api_key = os.getenv('DEEPSEEK_API_KEY')
+            # Try to get from environment variables; the *_KEYS variants take
+            # a comma-separated list so requests can be spread across accounts
+            openai_keys = load_keys('OPENAI_API_KEY')
+            deepseek_keys = load_keys('DEEPSEEK_API_KEY')
+
+            # Replayed exchanges never reach a provider, so keys are optional
+            if self.replayer:
+                openai_keys = openai_keys or [self.REPLAY_KEY]
+                deepseek_keys = deepseek_keys or [self.REPLAY_KEY]
             
             # If environment variables not found, raise error
-            if not self.openai_api_key or not self.deepseek_api_key:
+            if not openai_keys or not deepseek_keys:
                 raise ValueError(
                     "API keys not found in environment variables. "
-                    "Set OPENAI_API_KEY and DEEPSEEK_API_KEY environment variables "
+                    "Set OPENAI_API_KEY and DEEPSEEK_API_KEY (or OPENAI_API_KEYS and "
+                    "DEEPSEEK_API_KEYS) environment variables "
                     "or initialize with use_demo_keys=True for testing."
                 )
 
+        self.openai_api_key = openai_keys[0]
+        self.deepseek_api_key = deepseek_keys[0]
+        self.openai_keys = KeyPool("OpenAI", openai_keys)
+        self.deepseek_keys = KeyPool("DeepSeek", deepseek_keys)
+
+        # Prompts are compiled once and reused for every request
+        self.prompts: PromptRegistry = build_default_registry()
+
     def is_demo_mode(self) -> bool:
         """Check if running in demo mode with test keys."""
-        return self.openai_api_key == self.DEMO_OPENAI_KEY
+        return self.openai_api_key == self.DEMO_OPENAI_KEY and self.replayer is None
+
+    def _post(self, pool: KeyPool, url: str, data: Dict, **kwargs) -> requests.Response:
+        """
+        POST a request using a key from the pool.
+
+        A 429 or 401 evicts the key and the request is retried once on each of
+        the other keys in the pool before the last response is returned.
+        In replay mode the response comes from the archive instead of the network;
+        in record mode every response is also written to the archive.
+
+        Args:
+            pool (KeyPool): Key pool of the provider being called
+            url (str): Endpoint URL
+            data (Dict): JSON request body
+            **kwargs: Extra arguments for requests.post
+
+        Returns:
+            requests.Response: The provider's response
+        """
+        tried = []
+        while True:
+            api_key = pool.acquire(exclude=tried)
+            tried.append(api_key)
+            response = None
+            try:
+                if self.replayer:
+                    response = self.replayer.replay(url, data)
+                else:
+                    started = time.perf_counter()
+                    response = requests.post(url, headers=api_key.headers, json=data, **kwargs)
+                    if self.recorder:
+                        try:
+                            self.recorder.record(url, data, response, time.perf_counter() - started)
+                        except Exception as e:
+                            # A failed recording must not discard the provider's response
+                            print(f"Recording error: {str(e)}")
+            finally:
+                # Always release the key so its in-flight count cannot leak
+                if response is None:
+                    pool.release(api_key)
+                else:
+                    pool.release(api_key, response.status_code, response.headers)
+
+            if response.status_code not in (401, 429) or len(tried) >= len(pool):
+                return response
+            print(f"{pool.provider} key {api_key.label} returned {response.status_code}, trying next key")
 
     def get_deepseek_response(self, prompt: str) -> str:
         """
@@ -61,38 +153,22 @@ class ReasoningExtractor:
         Returns:
             str: DeepSeek's reasoning response
         """
-        headers = {
-            "Authorization": f"Bearer {self.deepseek_api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": "You are an AI assistant that provides clear step-by-step reasoning. Focus on explaining the thinking process and logical steps in a natural, flowing manner."},
-                {"role": "user", "content": f"""
-                Explain your reasoning process for this question in a natural, flowing way:
-                {prompt}
-                
-                Provide your thinking as a coherent narrative, walking through your reasoning steps naturally without using bullet points, section headers, or artificial structure. Just explain your thought process as you would in a conversation, moving from understanding the question to analyzing it and finally reaching a conclusion.
-                """}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1000
-        }
+        data = self.prompts.build_payload("deepseek_reasoning", prompt=prompt)
         
         try:
-            response = requests.post(
+            response = self._post(
+                self.deepseek_keys,
                 "https://api.deepseek.com/v1/chat/completions",
-                headers=headers,
-                json=data,
+                data,
                 verify=True
             )
             
             if response.status_code != 200:
                 raise Exception(f"DeepSeek API error: {response.text}")
                 
-            full_response = response.json()["choices"][0]["message"]["content"]
+            response_json = response.json()
+            self.prompts.record_usage("deepseek_reasoning", response_json.get("usage"))
+            full_response = response_json["choices"][0]["message"]["content"]
             print("DeepSeek Response:")
             print(full_response)
             
@@ -137,43 +213,23 @@ class ReasoningExtractor:
                 "status": "success"
             }
             
-        headers = {
-            "Authorization": f"Bearer {self.deepseek_api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": "deepseek-ai/deepseek-coder-33b-instruct",
-            "messages": [
-                {"role": "system", "content": "You are an AI assistant focused on analyzing and improving logical reasoning."},
-                {"role": "user", "content": f"""
-                Analyze and enhance the following reasoning:
-                
-                {reasoning}
-                
-                Please provide:
-                1. An evaluation of the logical structure
-                2. Any potential improvements or expansions
-                3. A confidence score for the reasoning
-                """}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1000
-        }
+        data = self.prompts.build_payload("deepseek_analysis", reasoning=reasoning)
         
         try:
-            response = requests.post(
+            response = self._post(
+                self.deepseek_keys,
                 "https://api.deepseek.ai/v1/chat/completions",
-                headers=headers,
-                json=data
+                data
             )
             
             if response.status_code != 200:
                 raise Exception(f"DeepSeek API error: {response.text}")
-                
+
+            response_json = response.json()
+            self.prompts.record_usage("deepseek_analysis", response_json.get("usage"))
             return {
                 "original_reasoning": reasoning,
-                "enhanced_reasoning": response.json()["choices"][0]["message"]["content"],
+                "enhanced_reasoning": response_json["choices"][0]["message"]["content"],
                 "status": "success"
             }
             
@@ -216,45 +272,21 @@ class ReasoningExtractor:
         Returns:
             str: Enhanced reasoning from ChatGPT
         """
-        headers = {
-            "Authorization": f"Bearer {self.openai_api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": "gpt-3.5-turbo",
-            "messages": [
-                {"role": "system", "content": "You are an expert at analyzing and improving reasoning processes. Your task is to enhance and expand upon the given reasoning while maintaining its logical structure."},
-                {"role": "user", "content": f"""
-                Here is a reasoning process that needs enhancement:
-
-                {reasoning}
-
-                Please improve this reasoning by:
-                1. Adding more depth to each logical step
-                2. Including relevant examples or analogies
-                3. Explaining the connections between steps more clearly
-                4. Adding any missing considerations
-                5. Strengthening the conclusion
-
-                Keep the same step-by-step structure but make it more comprehensive and insightful.
-                """}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 2000
-        }
+        data = self.prompts.build_payload("gpt_enhance", reasoning=reasoning)
         
         try:
-            response = requests.post(
+            response = self._post(
+                self.openai_keys,
                 "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=data
+                data
             )
             
             if response.status_code != 200:
                 raise Exception(f"ChatGPT API error: {response.text}")
-                
-            return response.json()["choices"][0]["message"]["content"]
+
+            response_json = response.json()
+            self.prompts.record_usage("gpt_enhance", response_json.get("usage"))
+            return response_json["choices"][0]["message"]["content"]
         except Exception as e:
             print(f"ChatGPT enhancement error: {str(e)}")
             raise
@@ -271,43 +303,23 @@ class ReasoningExtractor:
             str: Final answer from ChatGPT
         """
         # Use the DeepSeek response as reference
-        headers = {
-            "Authorization": f"Bearer {self.openai_api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": "gpt-3.5-turbo",
-            "messages": [
-                {"role": "system", "content": "You are an expert at providing clear, direct answers to questions with the help of references."},
-                {"role": "user", "content": f"""
-                I need you to answer this question: "{original_prompt}"
-
-                Please use the following reference to help you craft a comprehensive answer:
-
-                REFERENCE:
-                {reasoning}
-
-                Your task is to directly answer the question asked. Use the reference material to inform your answer, 
-                but respond in your own words in a natural, conversational style. Don't mention that you're using a reference.
-                Just provide a clear, helpful answer to the question as if you're having a conversation.
-                """}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1000
-        }
+        data = self.prompts.build_payload(
+            "gpt_answer", reasoning=reasoning, original_prompt=original_prompt
+        )
         
         try:
-            response = requests.post(
+            response = self._post(
+                self.openai_keys,
                 "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=data
+                data
             )
             
             if response.status_code != 200:
                 raise Exception(f"ChatGPT API error: {response.text}")
             
-            gpt_response = response.json()["choices"][0]["message"]["content"]
+            response_json = response.json()
+            self.prompts.record_usage("gpt_answer", response_json.get("usage"))
+            gpt_response = response_json["choices"][0]["message"]["content"]
             print("GPT Response:")
             print(gpt_response)
             
@@ -358,6 +370,17 @@ class ReasoningExtractor:
             
         return results
 
+    def get_key_stats(self) -> Dict[str, List[Dict]]:
+        """Get per-key request counts, remaining quota and utilization."""
+        return {
+            "openai": self.openai_keys.stats(),
+            "deepseek": self.deepseek_keys.stats()
+        }
+
+    def get_prompt_stats(self) -> Dict[str, Dict]:
+        """Get per-template token counts and prefix cache usage."""
+        return self.prompts.stats()
+
     def save_results(self, results: Dict, filepath: str) -> None:
         """Save results to JSON file."""
         with open(filepath, 'w') as f:
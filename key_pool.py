@@ -0,0 +1,219 @@
+import os
+import re
+import time
+import threading
+from typing import Dict, List, Optional
+
+# How long a key is kept out of rotation after the provider rejects it
+RATE_LIMIT_COOLDOWN = 60.0
+AUTH_FAILURE_COOLDOWN = 15 * 60.0
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a rate-limit reset value such as "20ms", "1s" or "6m0s" into seconds.
+
+    Args:
+        value (Optional[str]): Header value from the provider
+
+    Returns:
+        Optional[float]: Seconds until the limit resets, or None if unparseable
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def load_keys(env_var: str) -> List[str]:
+    """
+    Read API keys for a provider from the environment.
+
+    Accepts a comma-separated list in `<env_var>S` (e.g. OPENAI_API_KEYS) and the
+    single `<env_var>` value, de-duplicated in that order.
+
+    Args:
+        env_var (str): Name of the single-key variable, e.g. "OPENAI_API_KEY"
+
+    Returns:
+        List[str]: The configured keys, possibly empty
+    """
+    keys = []
+    for raw in (os.getenv(env_var + "S", ""), os.getenv(env_var, "")):
+        for key in raw.split(","):
+            key = key.strip()
+            if key and key not in keys:
+                keys.append(key)
+    return keys
+
+
+class ApiKey:
+    """A single API key and the quota last reported for it."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.label = f"...{key[-4:]}" if len(key) > 8 else "****"
+        self.headers = {
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json"
+        }
+        self.requests = 0
+        self.in_flight = 0
+        self.rate_limited = 0
+        self.auth_failures = 0
+        self.remaining_requests: Optional[int] = None
+        self.limit_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.limit_tokens: Optional[int] = None
+        self.quota_reset_at = 0.0
+        self.evicted_until = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.evicted_until
+
+    def effective_remaining(self, now: float) -> float:
+        """Last reported request quota less the requests still in flight."""
+        if self.remaining_requests is None or now >= self.quota_reset_at:
+            return float("inf")
+        return self.remaining_requests - self.in_flight
+
+    def has_quota(self, now: float) -> bool:
+        return self.effective_remaining(now) > 0
+
+    def utilization(self) -> Optional[float]:
+        """Fraction of the request quota used in the current window."""
+        if not self.limit_requests or self.remaining_requests is None:
+            return None
+        return round(1 - self.remaining_requests / self.limit_requests, 4)
+
+
+class KeyPool:
+    """
+    Spreads requests for one provider across several API keys.
+
+    Keys are chosen by fewest requests in flight, then by remaining request
+    quota (as reported in the provider's rate-limit response headers, less the
+    requests already in flight), skipping keys whose quota is used up. Keys that
+    receive a 429 or 401 are taken out of rotation for a cooldown period.
+    """
+
+    def __init__(self, provider: str, keys: List[str]):
+        """
+        Create a pool for a provider.
+
+        Args:
+            provider (str): Display name used in errors and stats
+            keys (List[str]): API keys to rotate between
+        """
+        if not keys:
+            raise ValueError(f"No API keys configured for {provider}")
+        self.provider = provider
+        self.keys = [ApiKey(key) for key in keys]
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def acquire(self, exclude: Optional[List[ApiKey]] = None) -> ApiKey:
+        """
+        Pick the key to use for the next request and mark it in flight.
+
+        If every key is evicted, the one whose cooldown ends first is returned so
+        callers still get the provider's own error rather than a local one.
+
+        Args:
+            exclude (Optional[List[ApiKey]]): Keys already tried for this request
+
+        Returns:
+            ApiKey: The selected key; pass it to `release` once the request ends
+        """
+        now = time.time()
+        with self._lock:
+            candidates = [k for k in self.keys if not exclude or k not in exclude] or self.keys
+            available = [k for k in candidates if k.is_available(now)]
+            if not available:
+                chosen = min(candidates, key=lambda k: k.evicted_until)
+            else:
+                # Rotate the starting point so ties are spread round-robin
+                start = self._next % len(available)
+                ordered = available[start:] + available[:start]
+                self._next += 1
+                chosen = max(ordered, key=lambda k: (
+                    k.has_quota(now),
+                    -k.in_flight,
+                    k.effective_remaining(now)
+                ))
+            chosen.in_flight += 1
+            chosen.requests += 1
+            return chosen
+
+    def release(self, api_key: ApiKey, status_code: Optional[int] = None,
+                headers: Optional[Dict[str, str]] = None) -> None:
+        """
+        Record the outcome of a request made with a key.
+
+        Args:
+            api_key (ApiKey): Key returned by `acquire`
+            status_code (Optional[int]): HTTP status, or None if no response
+            headers (Optional[Dict[str, str]]): Response headers
+        """
+        now = time.time()
+        headers = headers or {}
+        with self._lock:
+            api_key.in_flight = max(0, api_key.in_flight - 1)
+            self._update_quota(api_key, headers, now)
+
+            if status_code == 429:
+                api_key.rate_limited += 1
+                retry_after = parse_reset_duration(headers.get("retry-after"))
+                api_key.evicted_until = now + (retry_after or RATE_LIMIT_COOLDOWN)
+            elif status_code == 401:
+                api_key.auth_failures += 1
+                api_key.evicted_until = now + AUTH_FAILURE_COOLDOWN
+
+    def _update_quota(self, api_key: ApiKey, headers: Dict[str, str], now: float) -> None:
+        remaining = _parse_int(headers.get("x-ratelimit-remaining-requests"))
+        if remaining is None:
+            return
+        api_key.remaining_requests = remaining
+        api_key.limit_requests = _parse_int(headers.get("x-ratelimit-limit-requests"))
+        api_key.remaining_tokens = _parse_int(headers.get("x-ratelimit-remaining-tokens"))
+        api_key.limit_tokens = _parse_int(headers.get("x-ratelimit-limit-tokens"))
+        reset = parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+        api_key.quota_reset_at = now + (reset if reset is not None else RATE_LIMIT_COOLDOWN)
+
+    def stats(self) -> List[Dict]:
+        """Report per-key usage, remaining quota and eviction state."""
+        now = time.time()
+        with self._lock:
+            return [{
+                "key": k.label,
+                "requests": k.requests,
+                "in_flight": k.in_flight,
+                "rate_limited": k.rate_limited,
+                "auth_failures": k.auth_failures,
+                "remaining_requests": k.remaining_requests,
+                "limit_requests": k.limit_requests,
+                "remaining_tokens": k.remaining_tokens,
+                "limit_tokens": k.limit_tokens,
+                "utilization": k.utilization(),
+                "available": k.is_available(now),
+                "evicted_for": max(0.0, round(k.evicted_until - now, 1))
+            } for k in self.keys]
@@ -0,0 +1,265 @@
+import textwrap
+import threading
+from string import Formatter
+from typing import Dict, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text.
+
+    Uses the common ~4 characters per token heuristic for English text, which is
+    close enough for both GPT-3.5 and DeepSeek tokenizers to compare templates.
+
+    Args:
+        text (str): The text to measure
+
+    Returns:
+        int: Approximate token count
+    """
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
+def compact_prompt(text: str) -> str:
+    """
+    Remove source-code indentation and surrounding blank lines from a prompt.
+
+    Args:
+        text (str): Prompt text as written in a triple-quoted string
+
+    Returns:
+        str: The prompt with common leading whitespace stripped
+    """
+    return textwrap.dedent(text).strip()
+
+
+class PromptTemplate:
+    """
+    A chat prompt compiled once and rendered per request.
+
+    The system message, model settings and the user text before the first
+    placeholder are fixed at construction time, so every request built from the
+    same template starts with a byte-identical prefix that providers can cache.
+    """
+
+    def __init__(self, name: str, model: str, system: str, user: str,
+                 temperature: float = 0.7, max_tokens: int = 1000):
+        """
+        Compile a prompt template.
+
+        Args:
+            name (str): Registry name of the template
+            model (str): Model identifier sent with the request
+            system (str): System message content
+            user (str): User message with str.format style placeholders
+            temperature (float): Sampling temperature. Default 0.7.
+            max_tokens (int): Completion token limit. Default 1000.
+        """
+        self.name = name
+        self.model = model
+        self.system = compact_prompt(system)
+        self.user = compact_prompt(user)
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+        parsed = list(Formatter().parse(self.user))
+        self.user_prefix = parsed[0][0] if parsed else ""
+
+        self.system_tokens = estimate_tokens(self.system)
+        self.static_prefix_tokens = self.system_tokens + estimate_tokens(self.user_prefix)
+        self.template_tokens = self.system_tokens + estimate_tokens(self.user)
+
+        self._system_message = {"role": "system", "content": self.system}
+
+    def render(self, **values: str) -> str:
+        """Fill in the user message placeholders."""
+        return self.user.format(**values)
+
+    def build_payload(self, **values: str) -> Dict:
+        """
+        Build the chat completion request body for this template.
+
+        Args:
+            **values: Values for the user message placeholders
+
+        Returns:
+            Dict: JSON-serialisable request body
+        """
+        return {
+            "model": self.model,
+            "messages": [
+                self._system_message,
+                {"role": "user", "content": self.render(**values)}
+            ],
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+
+
+class PromptRegistry:
+    """
+    Holds compiled prompt templates and tracks their token usage.
+
+    Usage figures reported by the providers are accumulated per template so the
+    share of prompt tokens served from the provider prefix cache can be measured.
+    """
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._usage: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        """Add a compiled template to the registry."""
+        if template.name in self._templates:
+            raise ValueError(f"Prompt template already registered: {template.name}")
+        self._templates[template.name] = template
+        self._usage[template.name] = {
+            "requests": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0
+        }
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        """Look up a template by name."""
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise KeyError(f"Unknown prompt template: {name}")
+
+    def build_payload(self, name: str, **values: str) -> Dict:
+        """Build a request body from the named template."""
+        return self.get(name).build_payload(**values)
+
+    def record_usage(self, name: str, usage: Optional[Dict]) -> None:
+        """
+        Accumulate the `usage` block of a chat completion response.
+
+        Understands both OpenAI (`prompt_tokens_details.cached_tokens`) and
+        DeepSeek (`prompt_cache_hit_tokens`) cache reporting.
+
+        Args:
+            name (str): Template the request was built from
+            usage (Optional[Dict]): The response's usage object, if any
+        """
+        usage = usage or {}
+        details = usage.get("prompt_tokens_details") or {}
+        cached = details.get("cached_tokens")
+        if cached is None:
+            cached = usage.get("prompt_cache_hit_tokens", 0)
+
+        with self._lock:
+            stats = self._usage[name]
+            stats["requests"] += 1
+            stats["prompt_tokens"] += usage.get("prompt_tokens", 0) or 0
+            stats["completion_tokens"] += usage.get("completion_tokens", 0) or 0
+            stats["cached_tokens"] += cached or 0
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Report token counts for every registered template.
+
+        Returns:
+            Dict[str, Dict]: Per-template static prefix size, estimated template
+            size and the accumulated provider usage, including the cache hit rate
+        """
+        with self._lock:
+            usage_snapshot = {name: dict(usage) for name, usage in self._usage.items()}
+
+        report = {}
+        for name, template in self._templates.items():
+            usage = usage_snapshot[name]
+            prompt_tokens = usage["prompt_tokens"]
+            report[name] = {
+                "model": template.model,
+                "static_prefix_tokens": template.static_prefix_tokens,
+                "template_tokens": template.template_tokens,
+                **usage,
+                "cache_hit_rate": (
+                    round(usage["cached_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0
+                )
+            }
+        return report
+
+
+def build_default_registry() -> PromptRegistry:
+    """Compile the prompts used by the reasoning pipeline."""
+    registry = PromptRegistry()
+
+    registry.register(PromptTemplate(
+        name="deepseek_reasoning",
+        model="deepseek-chat",
+        system="You are an AI assistant that provides clear step-by-step reasoning. Focus on explaining the thinking process and logical steps in a natural, flowing manner.",
+        user="""
+        Explain your reasoning process for the question below in a natural, flowing way.
+
+        Provide your thinking as a coherent narrative, walking through your reasoning steps naturally without using bullet points, section headers, or artificial structure. Just explain your thought process as you would in a conversation, moving from understanding the question to analyzing it and finally reaching a conclusion.
+
+        QUESTION:
+        {prompt}
+        """
+    ))
+
+    registry.register(PromptTemplate(
+        name="deepseek_analysis",
+        model="deepseek-ai/deepseek-coder-33b-instruct",
+        system="You are an AI assistant focused on analyzing and improving logical reasoning.",
+        user="""
+        Analyze and enhance the reasoning below.
+
+        Please provide:
+        1. An evaluation of the logical structure
+        2. Any potential improvements or expansions
+        3. A confidence score for the reasoning
+
+        REASONING:
+        {reasoning}
+        """
+    ))
+
+    registry.register(PromptTemplate(
+        name="gpt_enhance",
+        model="gpt-3.5-turbo",
+        system="You are an expert at analyzing and improving reasoning processes. Your task is to enhance and expand upon the given reasoning while maintaining its logical structure.",
+        user="""
+        Below is a reasoning process that needs enhancement.
+
+        Please improve this reasoning by:
+        1. Adding more depth to each logical step
+        2. Including relevant examples or analogies
+        3. Explaining the connections between steps more clearly
+        4. Adding any missing considerations
+        5. Strengthening the conclusion
+
+        Keep the same step-by-step structure but make it more comprehensive and insightful.
+
+        REASONING:
+        {reasoning}
+        """,
+        max_tokens=2000
+    ))
+
+    registry.register(PromptTemplate(
+        name="gpt_answer",
+        model="gpt-3.5-turbo",
+        system="You are an expert at providing clear, direct answers to questions with the help of references.",
+        user="""
+        Answer the question below. Use the reference that follows it to help you craft a comprehensive answer.
+
+        Your task is to directly answer the question asked. Use the reference material to inform your answer,
+        but respond in your own words in a natural, conversational style. Don't mention that you're using a reference.
+        Just provide a clear, helpful answer to the question as if you're having a conversation.
+
+        QUESTION:
+        "{original_prompt}"
+
+        REFERENCE:
+        {reasoning}
+        """
+    ))
+
+    return registry
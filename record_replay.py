@@ -0,0 +1,201 @@
+import gzip
+import json
+import time
+import hashlib
+import threading
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Response headers worth keeping; everything else is dropped to keep archives small
+RECORDED_HEADERS = ("content-type", "retry-after")
+RECORDED_HEADER_PREFIXES = ("x-ratelimit-",)
+
+
+def request_key(url: str, data: Dict) -> str:
+    """
+    Identify a request independently of the API key used to send it.
+
+    Args:
+        url (str): Endpoint URL
+        data (Dict): JSON request body
+
+    Returns:
+        str: Stable hash of the endpoint and body
+    """
+    body = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{url}\n{body}".encode("utf-8")).hexdigest()[:32]
+
+
+def request_template(url: str, data: Dict) -> str:
+    """
+    Identify the prompt template a request was built from.
+
+    Hashes the endpoint, model and system message, which are fixed per template,
+    so fallbacks never serve one template's recording to another.
+
+    Args:
+        url (str): Endpoint URL
+        data (Dict): JSON request body
+
+    Returns:
+        str: Stable hash of the request's static parts
+    """
+    messages = data.get("messages") or [{}]
+    system = messages[0].get("content", "") if messages[0].get("role") == "system" else ""
+    return hashlib.sha256(f"{url}\n{data.get('model')}\n{system}".encode("utf-8")).hexdigest()[:32]
+
+
+def _keep_header(name: str) -> bool:
+    name = name.lower()
+    return name in RECORDED_HEADERS or name.startswith(RECORDED_HEADER_PREFIXES)
+
+
+class ExchangeRecorder:
+    """
+    Appends real provider exchanges to a gzip-compressed JSON lines archive.
+
+    Each line holds the request and template hashes, endpoint, model, response
+    status, the rate-limit headers, the response body and the round-trip time.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open an archive for recording. Existing archives are appended to.
+
+        Args:
+            path (str): Archive file, conventionally ending in .jsonl.gz
+        """
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def record(self, url: str, data: Dict, response: requests.Response, elapsed: float) -> None:
+        """
+        Store one exchange.
+
+        Args:
+            url (str): Endpoint URL
+            data (Dict): JSON request body
+            response (requests.Response): The provider's response
+            elapsed (float): Round-trip time in seconds
+        """
+        entry = {
+            "key": request_key(url, data),
+            "template": request_template(url, data),
+            "url": url,
+            "model": data.get("model"),
+            "elapsed": round(elapsed, 4),
+            "status": response.status_code,
+            "headers": {k.lower(): v for k, v in response.headers.items() if _keep_header(k)},
+            "body": response.text
+        }
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            # Each write is a complete gzip member, so a crash never corrupts earlier entries
+            with gzip.open(self.path, "ab") as f:
+                f.write(line)
+            self.count += 1
+
+
+class ExchangeReplayer:
+    """
+    Serves recorded exchanges back in place of real provider calls.
+
+    Requests are matched by their hash; repeated requests cycle through every
+    recording of that request in order. By default a request with no exact match
+    fails, so a changed prompt shows up in regression runs. With `strict` off it
+    is instead served a recording of the same template, picked from the request
+    hash so the choice does not depend on thread order; this lets load tests use
+    prompts that were never recorded.
+    """
+
+    def __init__(self, path: str, latency_scale: float = 1.0, strict: bool = True):
+        """
+        Load an archive for replay.
+
+        Args:
+            path (str): Archive written by ExchangeRecorder
+            latency_scale (float): Multiplier for recorded latencies. 0 replays
+                instantly, 1.0 reproduces the original timing. Default 1.0.
+            strict (bool): If True, only exact request matches are served.
+                Default True.
+        """
+        if latency_scale < 0:
+            raise ValueError("latency_scale must not be negative")
+        self.path = path
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self._by_key: Dict[str, List[Dict]] = {}
+        self._by_template: Dict[str, List[Dict]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fallbacks = 0
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._by_key.setdefault(entry["key"], []).append(entry)
+                self._by_template.setdefault(entry["template"], []).append(entry)
+
+        if not self._by_key:
+            raise ValueError(f"No recorded exchanges found in {path}")
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._by_key.values())
+
+    def _select(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entries = self._by_key.get(key)
+            if entries:
+                index = self._cursors.get(key, 0)
+                self._cursors[key] = index + 1
+                self.hits += 1
+                return entries[index % len(entries)]
+            return None
+
+    def _fallback(self, key: str, template: str) -> Optional[Dict]:
+        entries = self._by_template.get(template)
+        if not entries:
+            return None
+        with self._lock:
+            self.fallbacks += 1
+        return entries[int(key, 16) % len(entries)]
+
+    def replay(self, url: str, data: Dict) -> requests.Response:
+        """
+        Return the recorded response for a request, after its recorded latency.
+
+        Args:
+            url (str): Endpoint URL
+            data (Dict): JSON request body
+
+        Returns:
+            requests.Response: Response rebuilt from the archive
+        """
+        key = request_key(url, data)
+        entry = self._select(key)
+        if entry is None and not self.strict:
+            entry = self._fallback(key, request_template(url, data))
+        if entry is None:
+            raise requests.exceptions.ConnectionError(
+                f"No recorded exchange for {data.get('model')} at {url} in {self.path}"
+            )
+
+        delay = entry["elapsed"] * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = url
+        response.elapsed = timedelta(seconds=delay)
+        return response
@@ -1,11 +1,12 @@
 from index2 import ReasoningExtractor
+from key_pool import load_keys
 import os
 import json
 
 def check_api_keys():
     """Check if the required API keys are available."""
-    openai_key = os.getenv('OPENAI_API_KEY')
-    deepseek_key = os.getenv('DEEPSEEK_API_KEY')
+    openai_key = load_keys('OPENAI_API_KEY')
+    deepseek_key = load_keys('DEEPSEEK_API_KEY')
     
     if not openai_key:
         print("WARNING: OPENAI_API_KEY environment variable is not set.")
@@ -30,12 +31,17 @@ def print_demo_warning():
     print("="*80 + "\n")
 
 def main():
+    # Replayed runs serve recorded exchanges and need no real keys
+    replaying = bool(os.getenv('REASONING_REPLAY_PATH'))
+    
     # Check for environment variables
-    has_api_keys = check_api_keys()
+    has_api_keys = check_api_keys() if not replaying else True
     
     # Print demo warning if no real API keys are found
     if not has_api_keys:
         print_demo_warning()
+    elif replaying:
+        print("Replaying recorded provider exchanges; no network calls will be made.")
     
     # Initialize the extractor
     use_demo = not has_api_keys
@@ -68,6 +74,10 @@ def main():
         output_file = 'reasoning_results.json'
         extractor.save_results(results, output_file)
         print(f"\nResults saved to {output_file}")
+
+        if extractor.replayer:
+            print(f"Replayed {extractor.replayer.hits} exact matches and "
+                  f"{extractor.replayer.fallbacks} template fallbacks")
         
         # Also print the saved results for inspection
         print("\nSaved results (JSON format):")
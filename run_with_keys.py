@@ -3,6 +3,7 @@ import subprocess
 import sys
 import argparse
 from index2 import ReasoningExtractor
+from key_pool import load_keys
 from dotenv import load_dotenv
 
 def main():
@@ -10,16 +11,27 @@ def main():
     parser = argparse.ArgumentParser(description='Run the Reasoning Extractor model')
     parser.add_argument('--demo', action='store_true', help='Run in demo mode with placeholder keys')
     parser.add_argument('--prompt', type=str, help='The prompt to process')
+    parser.add_argument('--record', type=str, metavar='ARCHIVE',
+                        help='Record provider exchanges to this archive (.jsonl.gz)')
+    parser.add_argument('--replay', type=str, metavar='ARCHIVE',
+                        help='Serve provider exchanges from this archive instead of the network')
+    parser.add_argument('--latency-scale', type=float, default=None,
+                        help='Multiplier for recorded latencies when replaying (0 = instant)')
+    parser.add_argument('--replay-strict', dest='replay_strict', action='store_true', default=None,
+                        help='Fail requests that were never recorded (default)')
+    parser.add_argument('--replay-lenient', dest='replay_strict', action='store_false',
+                        help='Serve unrecorded requests a recording of the same prompt template')
     args = parser.parse_args()
     
     # Load environment variables from .env file if present
     load_dotenv()
     
     # Check if API keys are available in environment
-    has_api_keys = bool(os.getenv('OPENAI_API_KEY') and os.getenv('DEEPSEEK_API_KEY'))
+    has_api_keys = bool(load_keys('OPENAI_API_KEY') and load_keys('DEEPSEEK_API_KEY'))
     
-    # Determine whether to use demo mode
-    use_demo = args.demo or not has_api_keys
+    # Determine whether to use demo mode; replayed runs need no real keys
+    replaying = bool(args.replay or os.getenv('REASONING_REPLAY_PATH'))
+    use_demo = args.demo or not (has_api_keys or replaying)
     
     if use_demo:
         print("\n" + "="*80)
@@ -34,13 +46,21 @@ def main():
         print("   - DEEPSEEK_API_KEY='your-deepseek-api-key'")
         print("\nOr create a .env file in the project directory with these variables.")
         print("="*80 + "\n")
+    elif replaying:
+        print("Replaying recorded provider exchanges; no network calls will be made.")
     else:
         print("Using API keys from environment variables.")
     
     try:
         # Initialize the ReasoningExtractor
         print(f"\nInitializing Reasoning Extractor {'with demo keys' if use_demo else 'with environment variables'}...")
-        extractor = ReasoningExtractor(use_demo_keys=use_demo)
+        extractor = ReasoningExtractor(
+            use_demo_keys=use_demo,
+            record_path=args.record,
+            replay_path=args.replay,
+            replay_latency_scale=args.latency_scale,
+            replay_strict=args.replay_strict
+        )
         
         # Get prompt from command line or user input
         if args.prompt:
@@ -74,6 +94,12 @@ def main():
         output_file = 'reasoning_results.json'
         extractor.save_results(results, output_file)
         print(f"\nResults saved to {output_file}")
+
+        if extractor.recorder:
+            print(f"Recorded {extractor.recorder.count} exchanges to {extractor.recorder.path}")
+        if extractor.replayer:
+            print(f"Replayed {extractor.replayer.hits} exact matches and "
+                  f"{extractor.replayer.fallbacks} template fallbacks")
         
     except Exception as e:
         print(f"\nError: {str(e)}")